@@ -3,10 +3,21 @@ C parser
 '''
 
 # Python imports
+import collections
+import functools
+import hashlib
+import io
 import re
+import types
 
 from subprocess import Popen, PIPE
 
+# Optional in-process C preprocessor (otherwise 'cpp' is run)
+try:
+    import pcpp
+except ImportError:
+    pcpp = None
+
 # clara lib imports
 from .model import Var, Const, Op, Expr, VAR_IN, VAR_OUT, VAR_RET
 from .parser import Parser, ParseError, addlangparser, NotSupported, ParseError
@@ -14,10 +25,110 @@ from .parser import Parser, ParseError, addlangparser, NotSupported, ParseError
 # Parser imports
 from pycparser import c_ast, c_parser, plyparser
 
+# Frequently checked node classes
+_Case = c_ast.Case
+_Compound = c_ast.Compound
+_Constant = c_ast.Constant
+_Default = c_ast.Default
+_ID = c_ast.ID
+
+# Structure (line-map) prefixes
+_PFX_SWITCH = 'switch.'
+_PFX_IF = 'if.'
+_PFX_WHILE = 'while.'
+_PFX_DOWHILE = 'dowhile.'
+_PFX_FOR = 'for.'
+
+# Precompiled patterns
+_RE_INCORRECT = re.compile(r'^\s*//\s+#incorrect\s*', re.M)
+_RE_FEEDBACK = re.compile(r'^\s*//\s+#feedback\s+(.*)', re.M)
+_RE_INCLUDE = re.compile(r'\s*#include.*')
+_RE_SCANF_FMT = re.compile(
+    r'(%((d)|(i)|(li)|(lli)|(ld)|(lld)|(lf)|(f)|(s)|(c)))')
+_RE_PRINTF_LONG = re.compile(r'%(?:lf|ll?d)')
+
+# Types of scanf formats ('*' for unmatched arguments)
+_SCANF_TYPES = {
+    '%d': 'int', '%ld': 'int', '%i': 'int', '%li': 'int', '%lli': 'int',
+    '%lld': 'int',
+    '%c': 'char',
+    '%s': 'string',
+    '%f': 'float', '%lf': 'float',
+    '*': '*',
+}
+
+
+# Parsed (preprocessed) code cache
+_AST_CACHE = collections.OrderedDict()
+_AST_CACHE_SIZE = 128
+
+# Shared pycparser instance (building its tables is expensive)
+_CPARSER = None
+
+
+def _parse_ast(code):
+    '''
+    Parses preprocessed C code to an AST, reusing ASTs of identical code
+    '''
+
+    global _CPARSER
+
+    key = hashlib.sha1(code.encode('utf-8')).digest()
+    ast = _AST_CACHE.get(key)
+    if ast is not None:
+        _AST_CACHE.move_to_end(key)
+        return ast
+
+    if _CPARSER is None:
+        _CPARSER = c_parser.CParser()
+    ast = _CPARSER.parse(code)
+
+    _AST_CACHE[key] = ast
+    if len(_AST_CACHE) > _AST_CACHE_SIZE:
+        _AST_CACHE.popitem(last=False)
+
+    return ast
+
+
+# Expressions that add assignments when visited
+_EFFECT_UNARYOPS = frozenset(['++', '--', 'p++', 'p--'])
+_EFFECT_FNCS = frozenset(['scanf', 'printf'])
+
+
+def _haseffects(node):
+    '''
+    Checks (statically) whether visiting an expression adds assignments
+    '''
+
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        t = type(node)
+
+        if t is c_ast.Assignment:
+            return True
+        if t is c_ast.UnaryOp and node.op in _EFFECT_UNARYOPS:
+            return True
+        if (t is c_ast.FuncCall and type(node.name) is c_ast.ID and
+                node.name.name in _EFFECT_FNCS):
+            return True
+
+        todo.extend(child for _, child in node.children())
+
+    return False
+
+
+def _norm_printf(m):
+    '''
+    Normalizes a long printf format (%lf, %ld, %lld) to its short form
+    '''
+
+    return '%' + m.group(0)[-1]
+
 
 class CParser(Parser):
 
-    TYPE_SYNONYMS = {
+    TYPE_SYNONYMS = types.MappingProxyType({
         'double': 'float',
         'long_long_int': 'int',
         'long_int': 'int',
@@ -26,14 +137,14 @@ class CParser(Parser):
         'unsigned_int': 'int',
         'unsigned_long_int': 'int',
         'unsigned_long': 'int',
-    }
+    })
 
-    CONSTS = set(['EOF'])
+    CONSTS = frozenset(['EOF'])
     NOTOP = '!'
     OROP = '||'
     ANDOP = '&&'
 
-    LIB_FNCS = set([
+    LIB_FNCS = frozenset([
         'floor', 'ceil', 'pow', 'abs', 'sqrt', 'log2', 'log10', 'log', 'exp'
     ])
 
@@ -46,31 +157,94 @@ class CParser(Parser):
 
         self.fncdef = False
 
+        # Visitor methods by node class
+        self._visitors = {
+            c_ast.FileAST: self.visit_FileAST,
+            c_ast.FuncDef: self.visit_FuncDef,
+            c_ast.FuncDecl: self.visit_FuncDecl,
+            c_ast.Compound: self.visit_Compound,
+            c_ast.Assignment: self.visit_Assignment,
+            c_ast.ID: self.visit_ID,
+            c_ast.BinaryOp: self.visit_BinaryOp,
+            c_ast.UnaryOp: self.visit_UnaryOp,
+            c_ast.ArrayRef: self.visit_ArrayRef,
+            c_ast.Constant: self.visit_Constant,
+            c_ast.Cast: self.visit_Cast,
+            c_ast.TernaryOp: self.visit_TernaryOp,
+            c_ast.Switch: self.visit_Switch,
+            c_ast.FuncCall: self.visit_FuncCall,
+            c_ast.ExprList: self.visit_ExprList,
+            c_ast.If: self.visit_If,
+            c_ast.While: self.visit_While,
+            c_ast.DoWhile: self.visit_DoWhile,
+            c_ast.For: self.visit_For,
+            c_ast.Return: self.visit_Return,
+            c_ast.Break: self.visit_Break,
+            c_ast.Continue: self.visit_Continue,
+            c_ast.Label: self.visit_Label,
+            c_ast.Goto: self.visit_Goto,
+            c_ast.Decl: self.visit_Decl,
+            c_ast.ArrayDecl: self.visit_ArrayDecl,
+            c_ast.DeclList: self.visit_DeclList,
+            c_ast.TypeDecl: self.visit_TypeDecl,
+            c_ast.IdentifierType: self.visit_IdentifierType,
+            c_ast.Typename: self.visit_Typename,
+            c_ast.EmptyStatement: self.visit_EmptyStatement,
+            c_ast.InitList: self.visit_InitList,
+        }
+
+    def visit(self, node, prefix = ''):
+        '''
+        Dispatches on the node class, falling back to the generic
+        (name-based) visitor for unknown nodes
+        '''
+
+        t = type(node)
+
+        # Leaf nodes (inlined visit_Constant and visit_ID)
+        if t is _Constant:
+            return Const(node.value, line=node.coord.line)
+        if t is _ID:
+            if node.name in self.CONSTS:
+                return Const(node.name, line=node.coord.line)
+            return Var(node.name, line=node.coord.line)
+
+        meth = self._visitors.get(t)
+        if meth is None:
+            return super(CParser, self).visit(node, prefix = prefix)
+        return meth(node, prefix)
+
     def parse(self, code):
         '''
         Parses C code
         '''
 
         # Meta data
-        if re.findall(r'^\s*//\s+#incorrect\s*', code, flags=re.M):
+        if _RE_INCORRECT.search(code):
             self.prog.addmeta('incorrect', True)
-        mfeed = re.findall(r'^\s*//\s+#feedback\s+(.*)', code, flags=re.M)
+        mfeed = _RE_FEEDBACK.search(code)
         if mfeed:
-            self.prog.addmeta('feedback', mfeed[0])
+            self.prog.addmeta('feedback', mfeed.group(1))
 
         # Remove includes
-        code = re.sub(r'\s*#include.*', ' ', code)
-
-        # Run CPP
-        args = ['cpp', '-x', 'c', '-']
-        pipe = Popen(args, stdout=PIPE, stderr=PIPE, stdin=PIPE,
-                     universal_newlines=True)
-        code, err = pipe.communicate(code)
+        code = _RE_INCLUDE.sub(' ', code)
+
+        # Run preprocessor
+        if pcpp is not None:
+            pp = pcpp.Preprocessor()
+            pp.parse(code)
+            buf = io.StringIO()
+            pp.write(buf)
+            code = buf.getvalue()
+        else:
+            args = ['cpp', '-x', 'c', '-']
+            pipe = Popen(args, stdout=PIPE, stderr=PIPE, stdin=PIPE,
+                         universal_newlines=True)
+            code, err = pipe.communicate(code)
 
         # Get AST
-        parser = c_parser.CParser()
         try:
-            self.ast = parser.parse(code)
+            self.ast = _parse_ast(code)
         except plyparser.ParseError as e:
             raise ParseError(str(e))
     
@@ -95,13 +269,13 @@ class CParser(Parser):
 
         self.fncdef = True
         (name, rtype, _) = self.visit(node.decl.type.type, prefix = prefix)
+        fprefix = prefix + name + '.'
 
         params = []
         if node.decl.type.args:
             for param in node.decl.type.args.params:
-                param = self.visit(param, prefix = prefix + name + '.')
-                self.prog.addlinemap(node.coord.line, prefix + name + '.')
-                # print('Line %s: %s (c_parser, 103)' % (node.coord.line, prefix + name + '.'))
+                param = self.visit(param, prefix = fprefix)
+                self._linemap(node.coord.line, fprefix)
                 if param == 'void':
                     continue
                 if isinstance(param, Var):
@@ -117,9 +291,8 @@ class CParser(Parser):
             self.addtype(v, t)
         
         self.addloc(desc="at the beginning of the function '%s' at line %s" % (name, node.coord.line, ))
-        self.visit(node.body, prefix = prefix + name + '.')
-        self.prog.addlinemap(node.coord.line, prefix + name + '.')
-        # print('Line %s: %s (c_parser, 120)' % (node.coord.line, prefix + name + '.'))
+        self.visit(node.body, prefix = fprefix)
+        self._linemap(node.coord.line, fprefix)
 
         self.endfnc()
 
@@ -152,8 +325,7 @@ class CParser(Parser):
             self.addtype(v, t)
 
         self.endfnc()
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 155)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
         return (name, rtype, None)
         
@@ -163,15 +335,17 @@ class CParser(Parser):
         Attrs: block_items
         '''
 
-        if node.block_items:
-            for item in node.block_items:
-                res = self.visit(item, prefix = prefix)
+        items = node.block_items
+        if items:
+            visit = self.visit
+            for item in items:
+                res = visit(item, prefix)
 
-                if isinstance(res, Op) and res.name == 'FuncCall':
+                # (Op has no subclasses)
+                if type(res) is Op and res.name == 'FuncCall':
                     self.addexpr('_', res)
 
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 172)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
                 
     def visit_Assignment(self, node, prefix):
         '''
@@ -179,39 +353,40 @@ class CParser(Parser):
         Attrs: op, lvalue, rvalue
         '''
 
+        line = node.coord.line
+
         lvalue = self.visit_expr(node.lvalue, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 180)' % (node.coord.line, prefix))
+        self._linemap(line, prefix)
         postincdec = self.postincdec
         self.postincdec = 0
         rvalue = self.visit(node.rvalue, prefix = prefix)
         postincdec, self.postincdec = self.postincdec, postincdec
 
         if not rvalue:
-            rvalue = Const('?', line=node.coord.line)
+            rvalue = Const('?', line=line)
         
         # Cases of assignment operator
         if node.op == '=':
             pass
         elif len(node.op) == 2 and node.op[1] == '=':
-            rvalue = Op(node.op[0], lvalue.copy(), rvalue, line=rvalue.line)
+            rvalue = Op(node.op[0], lvalue, rvalue, line=rvalue.line)
         else:
             raise NotSupported("Assignment operator: '%s'" % (node.op,),
-                               line=node.coord.line)
+                               line=line)
 
         # Distinguish lvalue (ID and Array)
-        if isinstance(lvalue, Var):
+        if type(lvalue) is Var:
             lval = lvalue
         
-        elif (isinstance(lvalue, Op) and lvalue.name == '[]'and
-              isinstance(lvalue.args[0], Var)):
-            rvalue = Op('ArrayAssign', lvalue.args[0].copy(),
-                        lvalue.args[1].copy(), rvalue, line=node.coord.line)
+        elif (type(lvalue) is Op and lvalue.name == '[]' and
+              type(lvalue.args[0]) is Var):
+            rvalue = Op('ArrayAssign', lvalue.args[0], lvalue.args[1],
+                        rvalue, line=line)
             lval = lvalue.args[0]
 
         else:
             raise NotSupported("Assignment lvalue '%s'" % (lvalue,),
-                               line=node.coord.line)
+                               line=line)
 
         # List of expression
         if isinstance(rvalue, list):
@@ -219,6 +394,7 @@ class CParser(Parser):
         
         # Special case when previous assignment was p++/p--
         # push this assignment before the previous one
+        # (rvalue is copied here, so lvalue parts above are not)
         self.addexpr(lval.name, rvalue.copy(),
                      idx=-postincdec if postincdec else None)
 
@@ -246,9 +422,8 @@ class CParser(Parser):
         Array Initialization List
         Attrs: exprs
         '''
-        exprs = list(map(self.visit_expr, node.exprs or [], prefix))
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 249)' % (node.coord.line, prefix))
+        exprs = [self.visit_expr(e, prefix = prefix) for e in node.exprs or []]
+        self._linemap(node.coord.line, prefix)
         return Op('ArrayInit', *exprs, line=node.coord.line)
 
     def visit_BinaryOp(self, node, prefix):
@@ -319,8 +494,7 @@ class CParser(Parser):
         Attrs: to_type, expr
         '''
         tt = self.visit(node.to_type, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 325)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
         expr = self.visit_expr(node.expr, prefix = prefix)
         return Op('cast', Const(tt), expr, line=node.coord.line)
 
@@ -330,10 +504,16 @@ class CParser(Parser):
         Attrs: cond, iftrue, iffalse
         '''
 
+        # Branches with side-effects are converted to an if-statement
+        # (without visiting them speculatively first)
+        if _haseffects(node.iftrue) or _haseffects(node.iffalse):
+            self._linemap(node.coord.line, prefix)
+            return self.visit_if(node, node.cond, node.iftrue, node.iffalse, prefix)
+
         cond = self.visit_expr(node.cond, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 337)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
+        # Fallback for side-effects not detected above
         n = self.numexprs()
         ift = self.visit_expr(node.iftrue, prefix = prefix)
         iff = self.visit_expr(node.iffalse, prefix = prefix)
@@ -351,46 +531,46 @@ class CParser(Parser):
         '''
 
         # Parse condition
-        condexpr = self.visit_expr(node.cond, prefix = prefix + 'switch.')
-        self.prog.addlinemap(node.coord.line, prefix + 'switch.')
-        # print('Line %s: %s (c_parser, 340)' % (node.coord.line, prefix + 'switch.'))
+        swprefix = prefix + _PFX_SWITCH
+        condexpr = self.visit_expr(node.cond, prefix = swprefix)
+        self._linemap(node.coord.line, swprefix)
 
         # Check that stmt is a compound of "case"/"defaults"
         # and covert to "if-then-else"
         # TODO: Check only one "case"/"default"
-        if isinstance(node.stmt, c_ast.Compound):
-
-            n = len(node.stmt.block_items)
-
-            def convert(i):
+        if type(node.stmt) is _Compound:
 
-                if i >= n:
-                    return
+            items = node.stmt.block_items or []
+            n = len(items)
 
-                item = node.stmt.block_items[i]
+            def itemstmt(item):
+                return (_Compound(item.stmts, coord=item.coord)
+                        if type(item.stmts) is list else item.stmts)
 
-                # Item statement
-                stmt = (c_ast.Compound(item.stmts, coord=item.coord)
-                        if isinstance(item.stmts, list) else item.stmts)
-
-                if i == (n - 1) and isinstance(item, c_ast.Default):
-                    return stmt
-                    
-                if isinstance(item, c_ast.Case):
-                    next = convert(i + 1)
+            # Leading "case"s, optionally followed by a final "default"
+            stmt = None
+            cases = []
+            for i, item in enumerate(items):
+                if type(item) is _Case:
+                    cases.append(item)
+                    continue
+                if i == (n - 1) and type(item) is _Default:
+                    stmt = itemstmt(item)
+                break
 
-                    ifcond = c_ast.BinaryOp('==', node.cond, item.expr,
-                                            coord=item.expr.coord)
-                    return c_ast.If(ifcond, stmt, next, coord=item.expr.coord)
+            # Fold cases (from the last one) into an if-then-else chain
+            for item in reversed(cases):
+                ifcond = c_ast.BinaryOp('==', node.cond, item.expr,
+                                        coord=item.expr.coord)
+                stmt = c_ast.If(ifcond, itemstmt(item), stmt,
+                                coord=item.expr.coord)
 
-            stmt = convert(0)
             if stmt:
                 insw = self.inswitch
                 self.inswitch = True
                 
-                res = self.visit(stmt, prefix = prefix + 'switch.')
-                self.prog.addlinemap(node.coord.line, prefix + 'switch.')
-                # print('Line %s: %s (c_parser, 376)' % (node.coord.line, prefix + 'switch.'))
+                res = self.visit(stmt, prefix = swprefix)
+                self._linemap(node.coord.line, swprefix)
                 
                 self.inswitch = insw
                 
@@ -405,10 +585,11 @@ class CParser(Parser):
         Attrs: name, args
         '''
 
+        line = node.coord.line
+
         # Get (and check) name
         name = self.visit_expr(node.name, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 409)' % (node.coord.line, prefix))
+        self._linemap(line, prefix)
         if not isinstance(name, Var):
             raise NotSupported("Non-var function name: '%s'" % (name,),
                                line=name.line)
@@ -417,24 +598,25 @@ class CParser(Parser):
         args = self.visit(node.args, prefix = prefix) or []
 
         # Special cases (scanf & printf)
-        if name.name == 'scanf':
+        fname = name.name
+        if fname == 'scanf':
             return self.visit_scanf(node, args, prefix = prefix)
 
-        elif name.name == 'printf':
+        elif fname == 'printf':
             return self.visit_printf(node, args, prefix = prefix)
 
         # Program functions
-        elif name.name in self.fncs:
-            return Op('FuncCall', name, *args, line=node.coord.line)
+        elif fname in self.fncs:
+            return Op('FuncCall', name, *args, line=line)
 
         # Library functions
-        elif name.name in self.LIB_FNCS:
-            return Op(name.name, *args, line=node.coord.line)
+        elif fname in self.LIB_FNCS:
+            return Op(fname, *args, line=line)
 
         else:
             raise NotSupported(
-                "Unsupported function call: '%s'" % (name.name,),
-                line=node.coord.line)
+                "Unsupported function call: '%s'" % (fname,),
+                line=line)
 
     def visit_printf(self, node, args, prefix):
         '''
@@ -455,27 +637,26 @@ class CParser(Parser):
 be a format" % (node.coord.line,))
                 fmt = Const('?', line=node.coord.line)
 
-        fmt.value = fmt.value.replace('%lf', '%f')
-        fmt.value = fmt.value.replace('%ld', '%d')
-        fmt.value = fmt.value.replace('%lld', '%d')
+        fmt.value = _RE_PRINTF_LONG.sub(_norm_printf, fmt.value)
 
         expr = Op('StrAppend', Var(VAR_OUT),
                   Op('StrFormat', fmt, *args, line=node.coord.line),
                   line=node.coord.line)
         self.addexpr(VAR_OUT, expr)
 
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 466)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
     def visit_scanf(self, node, args, prefix):
         '''
         scanf function call
         '''
 
+        line = node.coord.line
+
         # Check format
         if len(args) == 0:
             self.warn("'scanf' without arguments at line %s (ignored)",
-                      node.coord.line)
+                      line)
         else:
             fmt = args[0]
 
@@ -486,43 +667,34 @@ be a format" % (node.coord.line,))
             else:
                 self.warn("First argument of 'scanf' at line %s should be a \
 (string) format (ignored)",
-                          node.coord.line)
+                          line)
                 fmt = ''
                 args = []
 
         # Extract format arguments
-        fs = list(re.findall(
-            r'(%((d)|(i)|(li)|(lli)|(ld)|(lld)|(lf)|(f)|(s)|(c)))', fmt))
+        fs = _RE_SCANF_FMT.findall(fmt)
 
         # Check argument number
         if len(fs) != len(args):
             self.addwarn("Mismatch between format and number of argument(s)\
 of 'scanf' at line %s.",
-                         node.coord.line)
+                         line)
 
             if len(args) > len(fs):
                 fs += ['*' for _ in range(len(args) - len(fs))]
 
         # Iterate formats and arguments
+        addexpr = self.addexpr
         for f, a in zip(fs, args):
 
             if f:
                 f = f[0]
 
             # Get type from an argument
-            if f in ['%d', '%ld', '%i', '%li', '%lli', '%lld']:
-                t = 'int'
-            elif f in ['%c']:
-                t = 'char'
-            elif f in ['%s']:
-                t = 'string'
-            elif f in ['%f', '%lf']:
-                t = 'float'
-            elif f == '*':
-                t = '*'
-            else:
+            t = _SCANF_TYPES.get(f)
+            if t is None:
                 self.addwarn("Invalid 'scanf' format at line %s.",
-                             node.coord.line)
+                             line)
                 t = '*'
 
             # Check argument type
@@ -531,29 +703,29 @@ of 'scanf' at line %s.",
 
             elif isinstance(a, Var) or (isinstance(a, Op) and a.name == '[]'):
                 self.addwarn("Forgoten '&' in 'scanf' at line %s?",
-                             node.coord.line)
+                             line)
 
             else:
                 raise NotSupported("Argument to scanf: '%s'" % (a,),
-                                   line=node.coord.line)
+                                   line=line)
 
             # Add operations
-            rexpr = Op('ListHead', Const(t), Var(VAR_IN), line=node.coord.line)
+            # (each head reads the input left by the previous tails, so the
+            # tails cannot be merged into one)
+            rexpr = Op('ListHead', Const(t), Var(VAR_IN), line=line)
             if isinstance(a, Var):
-                self.addexpr(a.name, rexpr)
+                addexpr(a.name, rexpr)
             elif isinstance(a, Op) and a.name == '[]' and isinstance(a.args[0],
                                                                      Var):
-                self.addexpr(a.args[0].name,
-                             Op('ArrayAssign', a.args[0], a.args[1], rexpr,
-                                line=node.coord.line))
+                addexpr(a.args[0].name,
+                        Op('ArrayAssign', a.args[0], a.args[1], rexpr,
+                           line=line))
             else:
                 raise NotSupported("Argument to scanf: '%s'" % (a,),
-                                   line=node.coord.line)
-            self.addexpr(VAR_IN,
-                         Op('ListTail', Var(VAR_IN), line=node.coord.line))
+                                   line=line)
+            addexpr(VAR_IN, Op('ListTail', Var(VAR_IN), line=line))
 
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 553)' % (node.coord.line, prefix))
+        self._linemap(line, prefix)
 
     def visit_ExprList(self, node, prefix):
         '''
@@ -561,10 +733,9 @@ of 'scanf' at line %s.",
         Attrs: exprs
         '''
 
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 563)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
-        return list(map(self.visit_expr, node.exprs, prefix))
+        return [self.visit_expr(e, prefix = prefix) for e in node.exprs]
 
     def visit_If(self, node, prefix):
         '''
@@ -572,9 +743,9 @@ of 'scanf' at line %s.",
         Attrs: cond, iftrue, iffalse
         '''
 
-        self.visit_if(node, node.cond, node.iftrue, node.iffalse, prefix = prefix + 'if.')
-        self.prog.addlinemap(node.coord.line, prefix + 'if.')
-        # print('Line %s: %s (c_parser, 548)' % (self.getline(node), prefix + 'if.'))
+        prefix += _PFX_IF
+        self.visit_if(node, node.cond, node.iftrue, node.iffalse, prefix = prefix)
+        self._linemap(node.coord.line, prefix)
 
     def visit_While(self, node, prefix):
         '''
@@ -585,10 +756,10 @@ of 'scanf' at line %s.",
         if self.inswitch:
             raise NotSupported("Loop inside switch", line=node.coord.line)
 
+        prefix += _PFX_WHILE
         self.visit_loop(node, None, node.cond, None, node.stmt,
-                        False, 'while', prefix = prefix + 'while.')
-        self.prog.addlinemap(node.coord.line, prefix + 'while.')
-        # print('Line %s: %s (c_parser, 561)' % (node.coord.line, prefix + 'while.'))
+                        False, 'while', prefix = prefix)
+        self._linemap(node.coord.line, prefix)
 
     def visit_DoWhile(self, node, prefix):
         '''
@@ -599,10 +770,10 @@ of 'scanf' at line %s.",
         if self.inswitch:
             raise NotSupported("Loop inside switch", line=node.coord.line)
 
+        prefix += _PFX_DOWHILE
         self.visit_loop(node, None, node.cond, None, node.stmt,
-                        True, 'do-while', prefix = prefix + 'dowhile.')
-        self.prog.addlinemap(node.coord.line, prefix + 'dowhile.')
-        # print('Line %s: %s (c_parser, 574)' % (node.coord.line, prefix + 'dowhile.'))
+                        True, 'do-while', prefix = prefix)
+        self._linemap(node.coord.line, prefix)
 
     def visit_For(self, node, prefix):
         '''
@@ -613,10 +784,10 @@ of 'scanf' at line %s.",
         if self.inswitch:
             raise NotSupported("Loop inside switch", line=node.coord.line)
 
+        prefix += _PFX_FOR
         self.visit_loop(node, node.init, node.cond, node.next, node.stmt,
-                        False, 'for', prefix = prefix + 'for.')
-        self.prog.addlinemap(node.coord.line, prefix + 'for.')
-        # print('Line %s: %s (c_parser, 587)' % (node.coord.line, prefix + 'for.'))
+                        False, 'for', prefix = prefix)
+        self._linemap(node.coord.line, prefix)
 
     def visit_Return(self, node, prefix):
         '''
@@ -625,8 +796,7 @@ of 'scanf' at line %s.",
         '''
 
         expr = self.visit_expr(node.expr, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 619)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
         if not expr:
             expr = Const('top', line=node.coord.line)
         self.addexpr(VAR_RET, expr)
@@ -653,8 +823,7 @@ of 'scanf' at line %s.",
                 node.coord.line,))
         self.addtrans(preloc, True, lastloop[1])
 
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 647)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
     def visit_Continue(self, node, prefix):
         '''
@@ -678,8 +847,7 @@ of 'scanf' at line %s.",
             desc="after 'continue' statement at line %s" % (
                 node.coord.line,))
         self.addtrans(preloc, True, lastloop[2] if lastloop[2] else lastloop[0])
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 671)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
     def visit_Label(self, node, prefix):
         '''
@@ -687,8 +855,7 @@ of 'scanf' at line %s.",
         Attrs: name, stmt
         '''
         self.addwarn('Ignoring label at line %s.', node.coord.line)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 680)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
         return self.visit(node.stmt, prefix = prefix)
 
     def visit_Goto(self, node, prefix):
@@ -697,8 +864,7 @@ of 'scanf' at line %s.",
         Attrs: name
         '''
         raise NotSupported('Not supporting GOTO - it is considered harmful.')
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 688)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
     def visit_Decl(self, node, prefix):
         '''
@@ -708,8 +874,7 @@ of 'scanf' at line %s.",
         '''
 
         (name, type, dim) = self.visit(node.type, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 697)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
         init = self.visit_expr(node.init, prefix = prefix, allownone=True)
 
         if not self.fncdef:
@@ -739,8 +904,7 @@ of 'scanf' at line %s.",
         '''
 
         (name, type, dim) = self.visit(node.type, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 727)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
         if dim is not None or type.endswith('[]'):
             raise NotSupported('Double Array', line=node.coord.line)
@@ -756,8 +920,7 @@ of 'scanf' at line %s.",
 
         for decl in node.decls:
             self.visit(decl, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 743)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
 
     def visit_TypeDecl(self, node, prefix):
         '''
@@ -774,8 +937,7 @@ of 'scanf' at line %s.",
         Attrs: names
         '''
 
-        name = '_'.join(node.names)
-        return self.TYPE_SYNONYMS.get(name, name)
+        return _resolve_typename(tuple(node.names))
 
     def visit_Typename(self, node, prefix):
         '''
@@ -783,12 +945,22 @@ of 'scanf' at line %s.",
         Attrs: quals, type
         '''
         (_, name, _) = self.visit(node.type, prefix = prefix)
-        self.prog.addlinemap(node.coord.line, prefix)
-        # print('Line %s: %s (c_parser, line 773)' % (node.coord.line, prefix))
+        self._linemap(node.coord.line, prefix)
         return str(name)
 
     def getline(self, node):
         return node.coord.line
             
 
+
+@functools.lru_cache(maxsize=256)
+def _resolve_typename(names):
+    '''
+    Maps a tuple of type names (e.g., ('unsigned', 'int')) to a clara type
+    '''
+
+    name = '_'.join(names)
+    return CParser.TYPE_SYNONYMS.get(name, name)
+
+
 addlangparser('c', CParser)
@@ -49,6 +49,9 @@ class Expr(object):
     An expression
     '''
 
+    # 'src' is set only on expressions collected by clustering
+    __slots__ = ('line', 'statement', 'original', 'src')
+
     def __init__(self, line=None, statement=False, original=None):
         self.line = line
         self.statement = statement
@@ -79,6 +82,8 @@ class Var(Expr):
     Variable
     '''
 
+    __slots__ = ('name', 'primed')
+
     def __init__(self, name, primed=False, *args, **kwargs):
         
         super(Var, self).__init__(*args, **kwargs)
@@ -153,6 +158,8 @@ class Const(Expr):
     Constant
     '''
 
+    __slots__ = ('value',)
+
     def __init__(self, value, *args, **kwargs):
 
         super(Const, self).__init__(*args, **kwargs)
@@ -203,6 +210,8 @@ class Op(Expr):
     Operations
     '''
 
+    __slots__ = ('name', 'args')
+
     def __init__(self, name, *args, **kwargs):
 
         super(Op, self).__init__(**kwargs)
@@ -57,6 +57,8 @@ class Parser(object):
         self.hasbcs = False
         self.nobcs = nobcs
 
+        self._last_linemap = (None, None)
+
     def newcnt(self):
         self.cnt += 1
         return self.cnt
@@ -64,6 +66,16 @@ class Parser(object):
     def ssavar(self, var):
         return '%s_&%d&' % (var, self.newcnt())
 
+    def _linemap(self, line, prefix):
+        '''
+        Maps a line to its structure (prefix), skipping repeated updates
+        '''
+
+        key = (line, prefix)
+        if key != self._last_linemap:
+            self.prog.addlinemap(line, prefix)
+            self._last_linemap = key
+
     def addwarn(self, msg, *args):
         if args:
             msg %= args
@@ -304,7 +316,6 @@ class Parser(object):
             self.getline(cond)
         ))
         condexpr = self.visit_expr(cond, allowlist=True, prefix = prefix)
-        # print('Line %s: %s (parser, 304)' % (self.getline(node), prefix + 'if.'))
         if isinstance(condexpr, list):
             condexpr = self.expr_list_and(condexpr)
         self.addexpr(VAR_COND, condexpr)
@@ -314,7 +325,6 @@ class Parser(object):
         trueloc = self.addloc('inside the if-branch starting at line %d' % (
             trueline))
         self.visit(true, prefix = prefix)
-        # print('Line %s: %s (parser, 314)' % (trueline, prefix + 'iftrue.'))
         afterloc1 = self.loc
 
         afterloc = self.addloc('after the if-statement beginning at line %s' % (
@@ -331,7 +341,6 @@ class Parser(object):
             falseloc = self.addloc('inside the else-branch starting at line %d' % (
                 self.getline(false)))
             self.visit(false, prefix = prefix)
-            # print('Line %s: %s (parser, 331)' % (self.getline(false), prefix + 'iffalse.'))
             afterloc2 = self.loc
 
             self.addtrans(condloc, False, falseloc)
@@ -411,7 +420,6 @@ class Parser(object):
         # Visit init stmts
         if init:
             self.visit(init, prefix = prefix)
-            # print('Line %s: %s (parser, 411)' % (self.getline(node), prefix + 'loop.'))
 
         # Add condition (with new location)
         preloc = self.loc
@@ -419,7 +427,6 @@ class Parser(object):
             condexpr = cond
         else:
             condexpr = self.visit_expr(cond, prefix = prefix, allowlist=True)
-            # print('Line %s: %s (parser, 419)' % (self.getline(node), prefix + 'loop.'))
             if isinstance(condexpr, list):
                 condexpr = self.expr_list_and(condexpr)
                 
@@ -440,7 +447,6 @@ class Parser(object):
                 name, self.getline(next)
             ))
             self.visit(next, prefix = prefix)
-            # print('Line %s: %s (parser, 440)' % (self.getline(node), prefix + 'loop.'))
         else:
             nextloc = None
 
@@ -453,7 +459,6 @@ class Parser(object):
             for x in prebody:
                 self.addexpr(*x)
         self.visit(body, prefix = prefix)
-        # print('Line %s: %s (parser, 453)' % (self.getline(node), prefix + 'loop.'))
         self.poploop()
         afterloc = self.loc
 
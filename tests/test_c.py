@@ -0,0 +1,22 @@
+"""
+Some basic (regression) C tests
+"""
+
+from utils import get_full_data_filename, parse_file
+
+from clara.interpreter import getlanginter
+from clara.model import VAR_OUT, prime
+from clara.parser import getlangparser
+
+def test_fnc_args():
+    f = get_full_data_filename("fncargs.c")
+    parser = getlangparser("c")
+    inter = getlanginter("c")
+
+    m = parse_file(f, parser)
+    inter = inter(entryfnc="main")
+
+    # All arguments (of printf and of a nested call) should be kept
+    trace = inter.run(m, ins=[1, 2, 3])
+    value = trace[-1][2][prime(VAR_OUT)]
+    assert value == '1 2 3 1 2 6\\n'